@@ -6,6 +6,12 @@
 PATH=$PATH:$(pwd)
 export PATH
 CURRENT=$(pwd)
+# Each account and region is initialized in its own working directory.
+# Share the downloaded providers between them, instead of fetching them
+# from the registry on every terraform init.
+export TF_PLUGIN_CACHE_DIR="${TF_PLUGIN_CACHE_DIR:-${CURRENT}/tmp/plugin-cache}"
+export TF_PLUGIN_CACHE_MAY_BREAK_DEPENDENCY_LOCK_FILE="${TF_PLUGIN_CACHE_MAY_BREAK_DEPENDENCY_LOCK_FILE:-true}"
+mkdir -p "$TF_PLUGIN_CACHE_DIR"
 terraform --version
 echo "Terraform stage: $TF_STAGE"
 
@@ -46,7 +52,7 @@ tfplan() {
   TS=$(date +%Y%m%d%H%M%S)
   bash "${CURRENT}/adf-build/helpers/sts.sh" "${TF_VAR_TARGET_ACCOUNT_ID}" "${TF_VAR_TARGET_ACCOUNT_ROLE}"
   set -o pipefail
-  terraform plan -out "${ADF_PROJECT_NAME}-${TF_VAR_TARGET_ACCOUNT_ID}" 2>&1 | tee -a "${ADF_PROJECT_NAME}-${TF_VAR_TARGET_ACCOUNT_ID}-${TS}.log"
+  terraform plan ${TF_PARALLELISM:+"-parallelism=$TF_PARALLELISM"} -out "${ADF_PROJECT_NAME}-${TF_VAR_TARGET_ACCOUNT_ID}" 2>&1 | tee -a "${ADF_PROJECT_NAME}-${TF_VAR_TARGET_ACCOUNT_ID}-${TS}.log"
   set +o pipefail
   # Save Terraform plan results to the S3 bucket
   aws s3 cp \
@@ -56,13 +62,13 @@ tfplan() {
   echo "Path to terraform plan s3://$S3_BUCKET_REGION_NAME/$ADF_PROJECT_NAME/tf-plan/$DATE/$TF_VAR_TARGET_ACCOUNT_ID/$ADF_PROJECT_NAME-$TF_VAR_TARGET_ACCOUNT_ID-$TS.log"
 }
 tfapply() {
-  terraform apply "${ADF_PROJECT_NAME}-${TF_VAR_TARGET_ACCOUNT_ID}"
+  terraform apply ${TF_PARALLELISM:+"-parallelism=$TF_PARALLELISM"} "${ADF_PROJECT_NAME}-${TF_VAR_TARGET_ACCOUNT_ID}"
 }
 tfplandestroy() {
-  terraform plan -destroy -out "${ADF_PROJECT_NAME}-${TF_VAR_TARGET_ACCOUNT_ID}-destroy"
+  terraform plan ${TF_PARALLELISM:+"-parallelism=$TF_PARALLELISM"} -destroy -out "${ADF_PROJECT_NAME}-${TF_VAR_TARGET_ACCOUNT_ID}-destroy"
 }
 tfdestroy() {
-  terraform apply "${ADF_PROJECT_NAME}-${TF_VAR_TARGET_ACCOUNT_ID}-destroy"
+  terraform apply ${TF_PARALLELISM:+"-parallelism=$TF_PARALLELISM"} "${ADF_PROJECT_NAME}-${TF_VAR_TARGET_ACCOUNT_ID}-destroy"
 }
 tfrun() {
   export TF_VAR_TARGET_ACCOUNT_ID=$ACCOUNT_ID
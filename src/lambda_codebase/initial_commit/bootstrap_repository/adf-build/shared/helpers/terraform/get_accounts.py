@@ -5,10 +5,14 @@
 Module used to get accounts list from target OUs.
 """
 
+import functools
 import json
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 import boto3
+from botocore.config import Config
 from paginator import paginator
 from partition import get_partition
 
@@ -16,15 +20,27 @@ from partition import get_partition
 logging.basicConfig(level=logging.INFO)
 LOGGER = logging.getLogger(__name__)
 LOGGER.setLevel(os.environ.get("ADF_LOG_LEVEL", logging.INFO))
-logging.basicConfig(level=logging.INFO)
 
 MANAGEMENT_ACCOUNT_ID = os.environ["MANAGEMENT_ACCOUNT_ID"]
 TARGET_OUS = os.environ.get("TARGET_OUS")
 REGION_DEFAULT = os.environ["AWS_REGION"]
 PARTITION = get_partition(REGION_DEFAULT)
-sts = boto3.client('sts')
-ssm = boto3.client('ssm')
 ORGANIZATIONS_READONLY_ROLE = "adf/organizations/adf-organizations-readonly"
+MAX_WORKERS = 10
+# Largest page size the Organizations list APIs accept
+PAGINATION_CONFIG = {'PageSize': 20}
+# Keep a pooled connection per worker thread and back off on throttling,
+# as the Organizations API rate limits bursts of concurrent calls
+CLIENT_CONFIG = Config(
+    max_pool_connections=MAX_WORKERS,
+    tcp_keepalive=True,
+    retries={
+        'mode': 'adaptive',
+        'max_attempts': 5,
+    },
+)
+CREDENTIALS_EXPIRY_MARGIN = timedelta(minutes=2)
+CLIENT_CACHE = {}
 
 
 def main():
@@ -38,6 +54,8 @@ def main():
             json.dump(accounts_from_ous, outfile)
 
 
+# Cached, as TARGET_OUS paths sharing a prefix look up the same parent OUs
+@functools.lru_cache(maxsize=None)
 def list_organizational_units_for_parent(parent_ou):
     organizations = get_boto3_client(
         'organizations',
@@ -47,15 +65,18 @@ def list_organizational_units_for_parent(parent_ou):
         ),
         'getOrganizationUnits',
     )
-    organizational_units = [
+    organizational_units = tuple(
         ou
         for org_units in (
             organizations
             .get_paginator("list_organizational_units_for_parent")
-            .paginate(ParentId=parent_ou)
+            .paginate(
+                ParentId=parent_ou,
+                PaginationConfig=PAGINATION_CONFIG,
+            )
         )
         for ou in org_units['OrganizationalUnits']
-    ]
+    )
     return organizational_units
 
 
@@ -75,18 +96,17 @@ def get_accounts():
         ),
         'getaccountIDs',
     )
-    return list(
-        map(
-            lambda account: {
-                'AccountId': account['Id'],
-                'Email': account['Email'],
-            },
-            filter(
-                lambda account: account['Status'] == 'ACTIVE',
-                paginator(organizations.list_accounts)
-            )
+    return [
+        {
+            'AccountId': account['Id'],
+            'Email': account['Email'],
+        }
+        for account in paginator(
+            organizations.list_accounts,
+            PaginationConfig=PAGINATION_CONFIG,
         )
-    )
+        if account['Status'] == 'ACTIVE'
+    ]
 
 
 def get_accounts_from_ous():
@@ -101,13 +121,7 @@ def get_accounts_from_ous():
         'getRootAccountIDs',
     )
     # Read organization root id
-    root_ids = list(
-        map(
-            lambda root: {'AccountId': root['Id']},
-            paginator(organizations.list_roots)
-        )
-    )
-    root_id = root_ids[0]['AccountId']
+    root_id = next(paginator(organizations.list_roots))['Id']
     for path in TARGET_OUS.split(','):
         # Set initial OU to start looking for given TARGET_OUS
         if parent_ou_id is None:
@@ -115,74 +129,105 @@ def get_accounts_from_ous():
 
         # Parse TARGET_OUS and find the ID
         ou_hierarchy = path.strip('/').split('/')
-        hierarchy_index = 0
         if path.strip() == '/':
             account_list.extend(
-                get_account_recursive(organizations, parent_ou_id, '/')
+                get_accounts_for_ou(organizations, parent_ou_id)
             )
         else:
-            while hierarchy_index < len(ou_hierarchy):
+            for ou_name in ou_hierarchy:
                 org_units = list_organizational_units_for_parent(parent_ou_id)
-                for ou in org_units:
-                    if ou['Name'] == ou_hierarchy[hierarchy_index]:
-                        parent_ou_id = ou['Id']
-                        hierarchy_index += 1
-                        break
-                else:
+                ou_ids_by_name = {ou['Name']: ou['Id'] for ou in org_units}
+                if ou_name not in ou_ids_by_name:
                     raise ValueError(
-                        f'Could not find ou with name {ou_hierarchy} in '
-                        f'OU list {org_units}.'
+                        f'Could not find ou with name {ou_name} of path '
+                        f'{ou_hierarchy} in OU list {org_units}.'
                     )
+                parent_ou_id = ou_ids_by_name[ou_name]
 
             account_list.extend(
-                get_account_recursive(organizations, parent_ou_id, '/'),
+                get_accounts_for_ou(organizations, parent_ou_id),
             )
         parent_ou_id = None
-    return account_list
+    # Overlapping TARGET_OUS paths, like /prod and /prod/team-a, return the
+    # same accounts more than once. Keep the first of each, in order.
+    return list(
+        {account['AccountId']: account for account in account_list}.values()
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_sts_client():
+    # Created on first use, so importing this module makes no AWS calls
+    return boto3.client('sts')
 
 
 def get_boto3_client(service, role, session_name):
-    role = sts.assume_role(
+    # Reuse the client of an earlier assume role call while its credentials
+    # are still valid, instead of assuming the same role again.
+    cached = CLIENT_CACHE.get((service, role))
+    expires_after = datetime.now(timezone.utc) + CREDENTIALS_EXPIRY_MARGIN
+    if cached and cached['Expiration'] > expires_after:
+        return cached['Client']
+    credentials = get_sts_client().assume_role(
         RoleArn=role,
         RoleSessionName=session_name,
         DurationSeconds=900
-    )
+    )['Credentials']
     session = boto3.Session(
-        aws_access_key_id=role['Credentials']['AccessKeyId'],
-        aws_secret_access_key=role['Credentials']['SecretAccessKey'],
-        aws_session_token=role['Credentials']['SessionToken']
+        aws_access_key_id=credentials['AccessKeyId'],
+        aws_secret_access_key=credentials['SecretAccessKey'],
+        aws_session_token=credentials['SessionToken']
     )
-    return session.client(service)
+    client = session.client(service, config=CLIENT_CONFIG)
+    CLIENT_CACHE[(service, role)] = {
+        'Client': client,
+        'Expiration': credentials['Expiration'],
+    }
+    return client
+
+
+def list_children(paginator_item, parent_id: str, child_type: str) -> list:
+    return [
+        child['Id']
+        for page in paginator_item.paginate(
+            ParentId=parent_id,
+            ChildType=child_type,
+            PaginationConfig=PAGINATION_CONFIG,
+        )
+        for child in page['Children']
+    ]
 
 
-def get_account_recursive(org_client: boto3.client, ou_id: str, path: str) -> list:
+def get_accounts_for_ou(org_client: boto3.client, ou_id: str) -> list:
     account_list = []
-    # Get OUs
     paginator_item = org_client.get_paginator('list_children')
-    pages = paginator_item.paginate(
-        ParentId=ou_id,
-        ChildType='ORGANIZATIONAL_UNIT'
-    )
-    for page in pages:
-        for child in page['Children']:
+    # Walk the OU tree breadth-first, listing all OUs at the same depth
+    # concurrently instead of one list_children call after another.
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        ou_ids = [ou_id]
+        while ou_ids:
+            child_ou_ids = executor.map(
+                lambda parent_id: list_children(
+                    paginator_item, parent_id, 'ORGANIZATIONAL_UNIT',
+                ),
+                ou_ids,
+            )
+            child_account_ids = executor.map(
+                lambda parent_id: list_children(
+                    paginator_item, parent_id, 'ACCOUNT',
+                ),
+                ou_ids,
+            )
+            ou_ids = [
+                child_id
+                for child_ids in child_ou_ids
+                for child_id in child_ids
+            ]
             account_list.extend(
-                get_account_recursive(
-                    org_client,
-                    child['Id'],
-                    f"{path}{ou_id}/",
-                )
+                {'AccountId': account_id}
+                for account_ids in child_account_ids
+                for account_id in account_ids
             )
-
-    # Get Accounts
-    pages = paginator_item.paginate(
-        ParentId=ou_id,
-        ChildType='ACCOUNT'
-    )
-    for page in pages:
-        for child in page['Children']:
-            account_list.append({
-                'AccountId': child['Id']
-            })
     return account_list
 
 
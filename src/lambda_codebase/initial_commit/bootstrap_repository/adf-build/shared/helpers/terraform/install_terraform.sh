@@ -6,9 +6,33 @@
 set -e
 
 apt-get install --assume-yes jq
-TERRAFORM_URL="https://releases.hashicorp.com/terraform/$TERRAFORM_VERSION/terraform_${TERRAFORM_VERSION}_linux_amd64.zip"
-echo "Downloading $TERRAFORM_URL."
-curl -o terraform.zip $TERRAFORM_URL
-unzip terraform.zip
+if [ -x ./terraform ] && [ "$(./terraform version -json 2>/dev/null | jq -r .terraform_version)" = "$TERRAFORM_VERSION" ]; then
+  # Skip the download when a cached build directory already holds it
+  echo "Terraform $TERRAFORM_VERSION is already installed."
+else
+  TERRAFORM_RELEASE_URL="https://releases.hashicorp.com/terraform/$TERRAFORM_VERSION"
+  # Pick the release matching the build host, e.g. ARM CodeBuild images
+  case "$(uname -m)" in
+    aarch64 | arm64) TERRAFORM_ARCH="arm64" ;;
+    *) TERRAFORM_ARCH="amd64" ;;
+  esac
+  TERRAFORM_ZIP="terraform_${TERRAFORM_VERSION}_linux_${TERRAFORM_ARCH}.zip"
+  TERRAFORM_SHA256SUMS="terraform_${TERRAFORM_VERSION}_SHA256SUMS"
+  echo "Downloading $TERRAFORM_RELEASE_URL/$TERRAFORM_ZIP."
+  # Fetch both files in one curl call, so they share a single connection
+  curl --fail --fail-early --silent --show-error --retry 3 \
+    -o "$TERRAFORM_ZIP" "$TERRAFORM_RELEASE_URL/$TERRAFORM_ZIP" \
+    -o "$TERRAFORM_SHA256SUMS" "$TERRAFORM_RELEASE_URL/$TERRAFORM_SHA256SUMS"
+  # Verify the archive against the checksums published by HashiCorp
+  grep " ${TERRAFORM_ZIP}\$" "$TERRAFORM_SHA256SUMS" | sha256sum --check -
+  # Write to a temporary file and rename it, so a failed or interrupted
+  # install never leaves a partial terraform binary behind
+  unzip -p "$TERRAFORM_ZIP" terraform > terraform.new
+  chmod 0755 terraform.new
+  mv -f terraform.new terraform
+  # Only the binary is needed. Drop the downloads so they are not passed
+  # on in the build artifact to every later stage
+  rm -f "$TERRAFORM_ZIP" "$TERRAFORM_SHA256SUMS"
+fi
 export PATH=$PATH:$(pwd)
 terraform --version